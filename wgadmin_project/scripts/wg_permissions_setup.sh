@@ -22,6 +22,10 @@ WG_GROUP="wgadmin"
 # WireGuard interface name
 WG_INTERFACE="wg0"
 
+# nginx worker user; set (e.g. "www-data") when WG_ACCEL_REDIRECT_LOCATION is enabled so
+# nginx can read the public config copies it serves. Empty leaves WG_PUBLIC_CONF_DIR group-only.
+NGINX_USER=""
+
 # ============================================================================
 # PATHS
 # ============================================================================
@@ -96,6 +100,7 @@ setup_permissions() {
     chmod 770 "${WG_PUBLIC_CONF_DIR}" "${WG_QR_DIR}"
     find "${WG_PUBLIC_CONF_DIR}" -type f -exec chmod 660 {} \; 2>/dev/null || true
     find "${WG_QR_DIR}" -type f -exec chmod 660 {} \; 2>/dev/null || true
+    setup_nginx_read_access
 
     # Temp and scripts
     chown root:"${WG_GROUP}" "${TEMP_DIR}"
@@ -112,6 +117,18 @@ setup_permissions() {
     log "Permissions set"
 }
 
+setup_nginx_read_access() {
+    [[ -n "${NGINX_USER}" ]] || return 0
+    command -v setfacl >/dev/null 2>&1 || die "setfacl not found (install the acl package) for NGINX_USER"
+    id "${NGINX_USER}" >/dev/null 2>&1 || die "User ${NGINX_USER} does not exist"
+    # Read-only ACL for nginx; the default entry covers configs written later by wg_create_peer.sh,
+    # and survives its chmod 770/660 since the group mask keeps the read bit.
+    setfacl -m u:"${NGINX_USER}":rx "${WG_PUBLIC_CONF_DIR}"
+    setfacl -d -m u:"${NGINX_USER}":r "${WG_PUBLIC_CONF_DIR}"
+    find "${WG_PUBLIC_CONF_DIR}" -type f -exec setfacl -m u:"${NGINX_USER}":r {} \; 2>/dev/null || true
+    log "Granted ${NGINX_USER} read access to ${WG_PUBLIC_CONF_DIR}"
+}
+
 setup_sudoers() {
     log "Configuring sudoers..."
 
@@ -7,12 +7,24 @@ log() { echo "$(date +'%Y-%m-%d %H:%M:%S%z') [wg_read_config] $*" >> "$LOG_FILE"
 
 WG_CONFIG_PATH="${WG_CONFIG_PATH:-/etc/wireguard/wg0.conf}"
 
+# --raw: print the config as-is instead of wrapping it in JSON
+RAW=false
+if [[ "${1:-}" == "--raw" ]]; then
+  RAW=true
+fi
+
 if [[ ! -f "$WG_CONFIG_PATH" ]]; then
   echo '{"status":"error","message":"config not found"}'
   log "error: config not found at ${WG_CONFIG_PATH}"
   exit 1
 fi
 
+if [[ "$RAW" == true ]]; then
+  log "read config ${WG_CONFIG_PATH} (raw)"
+  cat "$WG_CONFIG_PATH"
+  exit 0
+fi
+
 # Проверяем, что есть python3
 if ! command -v python3 >/dev/null 2>&1; then
   echo '{"status":"error","message":"python3 not found"}'
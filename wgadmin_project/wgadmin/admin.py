@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import ConfigDownloadToken
+from .models import AuditLog, ConfigDownloadToken
 
 
 @admin.register(ConfigDownloadToken)
@@ -8,3 +8,13 @@ class ConfigDownloadTokenAdmin(admin.ModelAdmin):
     list_display = ("client_identifier", "token", "is_active", "created_at", "expires_at")
     search_fields = ("client_identifier", "token")
     list_filter = ("is_active",)
+
+
+@admin.register(AuditLog)
+class AuditLogAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "action", "client_identifier", "performed_by")
+    # Join the user in the changelist query instead of fetching it once per row.
+    list_select_related = ("performed_by",)
+    search_fields = ("client_identifier",)
+    list_filter = ("action",)
+    date_hierarchy = "created_at"
@@ -1,14 +1,40 @@
+from argparse import ArgumentTypeError
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
 from wgadmin.models import ConfigDownloadToken
 
 
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
 class Command(BaseCommand):
     help = "Deactivate expired download tokens."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=_positive_int,
+            default=1000,
+            help="Number of tokens to deactivate per transaction.",
+        )
+
     def handle(self, *args, **options):
+        batch_size = options["batch_size"]
         now = timezone.now()
-        qs = ConfigDownloadToken.objects.filter(is_active=True, expires_at__lte=now)
-        count = qs.update(is_active=False)
+        expired = ConfigDownloadToken.objects.filter(is_active=True, expires_at__lte=now).order_by()
+        count = 0
+        # Short transactions keep row locks brief when a large backlog of tokens has expired.
+        while True:
+            batch_ids = list(expired.values_list("id", flat=True)[:batch_size])
+            if not batch_ids:
+                break
+            with transaction.atomic():
+                count += ConfigDownloadToken.objects.filter(id__in=batch_ids).update(is_active=False)
         self.stdout.write(self.style.SUCCESS(f"Deactivated {count} expired token(s)."))
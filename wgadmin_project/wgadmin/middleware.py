@@ -0,0 +1,17 @@
+from django.http import HttpRequest, HttpResponse
+
+from .models import AuditLog
+
+
+class AuditLogMiddleware:
+    """Collect audit entries recorded during a request and write them with one bulk INSERT."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        request._audit_log_buffer = []
+        response = self.get_response(request)
+        if request._audit_log_buffer:
+            AuditLog.record_many(request._audit_log_buffer)
+        return response
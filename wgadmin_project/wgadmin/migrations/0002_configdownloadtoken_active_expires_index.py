@@ -0,0 +1,14 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wgadmin", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="configdownloadtoken",
+            index=models.Index(fields=["is_active", "expires_at"], name="token_active_expires_idx"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wgadmin", "0002_configdownloadtoken_active_expires_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=models.Index(fields=["-created_at"], name="audit_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=models.Index(fields=["client_identifier", "-created_at"], name="audit_client_created_idx"),
+        ),
+    ]
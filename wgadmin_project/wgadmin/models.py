@@ -1,6 +1,6 @@
 import secrets
 from datetime import timedelta
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from django.conf import settings
 from django.db import models
@@ -17,6 +17,9 @@ class ConfigDownloadToken(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["is_active", "expires_at"], name="token_active_expires_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.client_identifier} ({'active' if self.is_active else 'inactive'})"
@@ -27,7 +30,7 @@ class ConfigDownloadToken(models.Model):
 
     @classmethod
     def create_token(cls, client_identifier: str, client_name: str = "", ttl_minutes: int = 60) -> "ConfigDownloadToken":
-        token = secrets.token_urlsafe(48)
+        token = secrets.token_urlsafe(32)
         expires_at = timezone.now() + timedelta(minutes=ttl_minutes)
         return cls.objects.create(
             client_identifier=client_identifier,
@@ -55,6 +58,15 @@ class AuditLog(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["-created_at"], name="audit_created_idx"),
+            models.Index(fields=["client_identifier", "-created_at"], name="audit_client_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.action} {self.client_identifier} at {self.created_at.isoformat()}"
+
+    @classmethod
+    def record_many(cls, entries: Iterable[Dict[str, Any]]) -> List["AuditLog"]:
+        """Insert several audit entries with one bulk INSERT per 100 rows."""
+        return cls.objects.bulk_create([cls(**entry) for entry in entries], batch_size=100)
@@ -2,18 +2,30 @@ from __future__ import annotations
 
 import json
 import logging
+import os
 import re
 import subprocess
-from dataclasses import dataclass
-from datetime import datetime
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
 
 from django.conf import settings
-from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+# "[Peer]" headers, including ones commented out to disable a peer.
+_PEER_HEADER_RE = re.compile(r"\A\s*#*\s*\[peer\]", re.IGNORECASE)
+# "# alice" or "# Name: alice" comments naming the next peer.
+_NAME_COMMENT_RE = re.compile(r"\A\s*#+\s*(?:name\s*:)?\s*(.*?)\s*\Z", re.IGNORECASE)
+
+
+# config path -> ((mtime_ns, size, inode), parsed peers). Process-wide so every service
+# instance shares one parse until the config file changes. Size and inode catch writes
+# from other workers that land within the same mtime tick.
+_PARSE_CACHE: Dict[Path, tuple[tuple[int, int, int], List[WireGuardPeer]]] = {}
+
 
 class WireGuardError(Exception):
     """Raised when the WireGuard service encounters a problem."""
@@ -23,7 +35,7 @@ class WireGuardScriptError(WireGuardError):
     """Raised when an underlying management script fails."""
 
 
-@dataclass
+@dataclass(slots=True)
 class WireGuardPeer:
     identifier: str
     name: str
@@ -38,6 +50,22 @@ class WireGuardPeer:
     raw_block: Optional[List[str]] = None
 
 
+@dataclass(slots=True)
+class RuntimeStatus:
+    endpoint: Optional[str]
+    allowed_ips: str
+    handshake_ts: int
+    transfer_rx: int
+    transfer_tx: int
+    persistent_keepalive: Optional[int]
+
+    @property
+    def latest_handshake(self) -> Optional[datetime]:
+        if not self.handshake_ts:
+            return None
+        return datetime.fromtimestamp(self.handshake_ts, tz=timezone.utc)
+
+
 class WireGuardService:
     def __init__(
         self,
@@ -49,10 +77,15 @@ class WireGuardService:
         self.interface = interface or settings.WG_INTERFACE
         self.scripts_dir = Path(scripts_dir or settings.WG_SCRIPTS_DIR)
         self.client_config_dir = settings.WG_CLIENT_CONFIG_DIR
+        self.public_config_dir = settings.WG_PUBLIC_CONF_DIR
         self.script_timeout = getattr(settings, "WG_SCRIPT_TIMEOUT", 15)
         # Use sudo by default so scripts can run with root privileges via sudoers; can be disabled via WG_USE_SUDO.
         self.use_sudo = getattr(settings, "WG_USE_SUDO", True)
         self.sudo_bin = getattr(settings, "WG_SUDO_BIN", "sudo")
+        # Seconds a `wg show dump` result is reused, so one page render runs it at most once.
+        self.runtime_cache_ttl = getattr(settings, "WG_RUNTIME_CACHE_TTL", 1.0)
+        # (monotonic timestamp, runtime map) from the last `wg show dump`.
+        self._runtime_cache: tuple[float, Dict[str, RuntimeStatus]] | None = None
 
     # -------------------- Parsing --------------------
     def list_peers(self, include_runtime: bool = True) -> List[WireGuardPeer]:
@@ -65,74 +98,102 @@ class WireGuardService:
             for peer in peers:
                 status = runtime.get(peer.public_key)
                 if status:
-                    peer.latest_handshake = status.get("latest_handshake")
-                    peer.transfer_rx = status.get("transfer_rx")
-                    peer.transfer_tx = status.get("transfer_tx")
-                    peer.persistent_keepalive = status.get("persistent_keepalive")
-                    peer.endpoint = status.get("endpoint")
+                    peer.latest_handshake = status.latest_handshake
+                    peer.transfer_rx = status.transfer_rx
+                    peer.transfer_tx = status.transfer_tx
+                    peer.persistent_keepalive = status.persistent_keepalive
+                    peer.endpoint = status.endpoint
         return peers
 
-    def get_peer(self, identifier: str) -> Optional[WireGuardPeer]:
-        identifier = identifier.strip()
-        for peer in self.list_peers(include_runtime=True):
-            if peer.identifier == identifier or peer.public_key == identifier:
-                return peer
-        return None
+    def get_peer(self, identifier: str, include_runtime: bool = False) -> Optional[WireGuardPeer]:
+        return self.peers_by_key(include_runtime=include_runtime).get(identifier.strip())
+
+    def peers_by_key(self, include_runtime: bool = False) -> Dict[str, WireGuardPeer]:
+        """Map both identifiers and public keys to peers; the first peer in config order wins."""
+        lookup: Dict[str, WireGuardPeer] = {}
+        for peer in self.list_peers(include_runtime=include_runtime):
+            lookup.setdefault(peer.identifier, peer)
+            lookup.setdefault(peer.public_key, peer)
+        return lookup
 
     def _parse_config(self) -> List[WireGuardPeer]:
-        lines = self._read_config_lines()
+        signature = self._config_signature()
+        cached = _PARSE_CACHE.get(self.config_path)
+        if signature is not None and cached and cached[0] == signature:
+            # Hand out copies: list_peers() fills runtime fields in place.
+            return [replace(peer) for peer in cached[1]]
+        peers = self._parse_config_lines()
+        if signature is not None:
+            _PARSE_CACHE[self.config_path] = (signature, [replace(peer) for peer in peers])
+        return peers
+
+    def _config_signature(self) -> Optional[tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            # Without access to the config directory we cannot tell when it changes; skip caching.
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _parse_config_lines(self) -> List[WireGuardPeer]:
         peers: List[WireGuardPeer] = []
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
+        block: Optional[List[str]] = None
+        block_name: Optional[str] = None
+        # Nearest non-empty comment directly above the upcoming [Peer] header.
+        pending_name: Optional[str] = None
+        for raw_line in self._read_config_lines():
+            line = raw_line.strip()
             if self._is_peer_header(line):
-                name = self._extract_name(lines, i)
-                block_lines, jump_to = self._collect_block(lines, i)
-                peer = self._parse_peer_block(block_lines, name)
-                if peer:
-                    peers.append(peer)
-                i = jump_to
+                if block is not None:
+                    self._append_peer(peers, block, block_name)
+                block = [raw_line]
+                block_name = pending_name
+                pending_name = None
                 continue
-            i += 1
+            if line.startswith("#"):
+                pending_name = self._name_from_comment(line) or pending_name
+            else:
+                pending_name = None
+            if block is not None:
+                block.append(raw_line)
+        if block is not None:
+            self._append_peer(peers, block, block_name)
         return peers
 
-    def _read_config_lines(self) -> List[str]:
-        if self.use_sudo:
-            data = self._run_script("wg_read_config.sh", {}).get("config", "")
+    def _append_peer(self, peers: List[WireGuardPeer], block_lines: List[str], name: Optional[str]) -> None:
+        peer = self._parse_peer_block(block_lines, name)
+        if peer:
+            peers.append(peer)
+
+    def _read_config_lines(self) -> Iterator[str]:
+        # wg_permissions_setup.sh makes the config group-readable; only fall back to the
+        # sudo script (a sudo + bash + python fork chain) when we cannot read it ourselves.
+        if self.use_sudo and not os.access(self.config_path, os.R_OK):
+            # --raw prints the config verbatim, skipping the JSON string escape/unescape round-trip.
+            data = self._run_script_raw("wg_read_config.sh", ["--raw"])
             if not data:
                 raise WireGuardError(f"Unable to read config via script: {self.config_path}")
-            return data.splitlines()
+            return iter(data.splitlines())
         try:
-            return self.config_path.read_text(encoding="utf-8").splitlines()
+            handle = self.config_path.open(encoding="utf-8")
         except PermissionError as exc:
             raise WireGuardError(f"Permission denied reading config: {self.config_path}") from exc
         except FileNotFoundError as exc:
             raise WireGuardError(f"Config path not found: {self.config_path}") from exc
+        return self._iter_file_lines(handle)
+
+    def _iter_file_lines(self, handle: TextIO) -> Iterator[str]:
+        # Stream the file so the parser never holds the whole config as a list of lines.
+        with handle:
+            for line in handle:
+                yield line.rstrip("\n")
 
     def _is_peer_header(self, line: str) -> bool:
-        normalized = line.lstrip("#").strip()
-        return normalized.lower().startswith("[peer]")
-
-    def _collect_block(self, lines: List[str], start_index: int) -> tuple[list[str], int]:
-        block: list[str] = []
-        j = start_index
-        while j < len(lines):
-            if j != start_index and self._is_peer_header(lines[j]):
-                break
-            block.append(lines[j])
-            j += 1
-        return block, j
-
-    def _extract_name(self, lines: List[str], start_index: int) -> Optional[str]:
-        k = start_index - 1
-        while k >= 0 and lines[k].strip().startswith("#"):
-            comment = lines[k].strip().lstrip("#").strip()
-            if comment:
-                if comment.lower().startswith("name:"):
-                    return comment.split(":", 1)[1].strip()
-                return comment
-            k -= 1
-        return None
+        return bool(_PEER_HEADER_RE.match(line))
+
+    def _name_from_comment(self, line: str) -> Optional[str]:
+        match = _NAME_COMMENT_RE.match(line)
+        return (match.group(1) or None) if match else None
 
     def _parse_peer_block(self, block_lines: List[str], name: Optional[str]) -> Optional[WireGuardPeer]:
         is_enabled = any(line.strip() and not line.strip().startswith("#") for line in block_lines)
@@ -148,7 +209,7 @@ class WireGuardService:
         if not public_key:
             return None
 
-        allowed_ips = [ip.strip() for ip in data.get("allowedips", "").split(",") if ip.strip()]
+        allowed_ips = [stripped for ip in data.get("allowedips", "").split(",") if (stripped := ip.strip())]
         persistent_keepalive = None
         if "persistentkeepalive" in data:
             try:
@@ -169,7 +230,15 @@ class WireGuardService:
         )
 
     # -------------------- Runtime data --------------------
-    def _runtime_peer_map(self) -> Dict[str, Dict]:
+    def _runtime_peer_map(self) -> Dict[str, RuntimeStatus]:
+        now = time.monotonic()
+        if self._runtime_cache and now - self._runtime_cache[0] < self.runtime_cache_ttl:
+            return self._runtime_cache[1]
+        status = self._read_runtime_dump()
+        self._runtime_cache = (now, status)
+        return status
+
+    def _read_runtime_dump(self) -> Dict[str, RuntimeStatus]:
         try:
             proc = subprocess.run(
                 ["wg", "show", self.interface, "dump"],
@@ -183,42 +252,51 @@ class WireGuardService:
             raise WireGuardError(f"wg show failed: {exc.stderr}") from exc
 
         lines = proc.stdout.splitlines()
-        status: Dict[str, Dict] = {}
+        status: Dict[str, RuntimeStatus] = {}
         # dump format: private-key, public-key, preshared-key, endpoint, allowed-ips,
         # latest-handshake, transfer-rx, transfer-tx, persistent-keepalive
         for line in lines[1:]:
-            parts = line.split("\t")
-            if len(parts) < 9:
+            try:
+                _, public_key, _, endpoint, allowed_ips, handshake, rx, tx, keepalive = line.split("\t", 8)
+            except ValueError:
                 continue
-            public_key = parts[1]
-            latest_handshake = int(parts[5]) if parts[5].isdigit() else 0
-            status[public_key] = {
-                "endpoint": parts[3] if parts[3] != "(none)" else None,
-                "allowed_ips": parts[4],
-                "latest_handshake": (
-                    datetime.fromtimestamp(latest_handshake, tz=timezone.utc) if latest_handshake else None
-                ),
-                "transfer_rx": int(parts[6]),
-                "transfer_tx": int(parts[7]),
-                "persistent_keepalive": int(parts[8]) if parts[8].isdigit() else None,
-            }
+            status[public_key] = RuntimeStatus(
+                endpoint=endpoint if endpoint != "(none)" else None,
+                allowed_ips=allowed_ips,
+                handshake_ts=int(handshake) if handshake.isdigit() else 0,
+                transfer_rx=int(rx),
+                transfer_tx=int(tx),
+                persistent_keepalive=int(keepalive) if keepalive.isdigit() else None,
+            )
         return status
 
     # -------------------- Script wrappers --------------------
     def create_peer(self, name: str, allowed_ips: str = "0.0.0.0/0") -> Dict:
+        _PARSE_CACHE.pop(self.config_path, None)
         return self._run_script("wg_create_peer.sh", ["--name", name, "--allowed-ips", allowed_ips])
 
     def delete_peer(self, identifier: str) -> Dict:
+        _PARSE_CACHE.pop(self.config_path, None)
         return self._run_script("wg_delete_peer.sh", ["--id", identifier])
 
     def set_peer_enabled(self, identifier: str, enabled: bool) -> Dict:
         flag = "--enable" if enabled else "--disable"
+        _PARSE_CACHE.pop(self.config_path, None)
         return self._run_script("wg_toggle_peer.sh", [flag, "--id", identifier])
 
     def generate_qr(self, identifier: str) -> Dict:
         return self._run_script("wg_generate_qr.sh", ["--id", identifier])
 
     def _run_script(self, script_name: str, args: Iterable[str] | Dict[str, str]) -> Dict:
+        stdout = self._run_script_raw(script_name, args).strip()
+        if not stdout:
+            return {}
+        try:
+            return json.loads(stdout)
+        except json.JSONDecodeError as exc:
+            raise WireGuardScriptError(f"{script_name} returned non-JSON output: {stdout}") from exc
+
+    def _run_script_raw(self, script_name: str, args: Iterable[str] | Dict[str, str]) -> str:
         script_path = self.scripts_dir / script_name
         if not script_path.exists():
             raise WireGuardError(f"Script not found: {script_path}")
@@ -237,23 +315,21 @@ class WireGuardService:
             raise WireGuardScriptError(f"{script_name} timed out after {self.script_timeout}s") from exc
         except subprocess.CalledProcessError as exc:
             raise WireGuardScriptError(f"{script_name} failed: {exc.stderr}") from exc
-
-        stdout = proc.stdout.strip()
-        if not stdout:
-            return {}
-        try:
-            return json.loads(stdout)
-        except json.JSONDecodeError as exc:
-            raise WireGuardScriptError(f"{script_name} returned non-JSON output: {stdout}") from exc
+        return proc.stdout
 
     # -------------------- Config helpers --------------------
     def get_config_path(self, peer: WireGuardPeer) -> Path:
         primary_path = self.client_config_dir / f"{peer.identifier}.conf"
         if primary_path.exists():
             return primary_path
-        fallback = settings.WG_PUBLIC_CONF_DIR / f"{peer.identifier}.conf"
+        fallback = self.public_config_dir / f"{peer.identifier}.conf"
         return fallback
 
+    def get_public_config_path(self, peer: WireGuardPeer) -> Optional[Path]:
+        """Return the peer's copy in WG_PUBLIC_CONF_DIR (the one nginx can serve), if it exists."""
+        public_path = self.public_config_dir / f"{peer.identifier}.conf"
+        return public_path if public_path.exists() else None
+
     def read_config_for_peer(self, peer: WireGuardPeer) -> str:
         config_path = self.get_config_path(peer)
         if not config_path.exists():
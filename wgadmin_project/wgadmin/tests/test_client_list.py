@@ -0,0 +1,55 @@
+import os
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from wgadmin.models import AuditLog, ConfigDownloadToken
+from wgadmin.services.wireguard import WireGuardPeer
+
+
+@mock.patch.dict(os.environ, {"SERVER_WG_IPV4_PREFIX": ""})
+class ClientListViewTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("admin", password="pw", is_staff=True)
+        self.client.force_login(self.user)
+        self.peers = [
+            WireGuardPeer(identifier="alice", name="alice", public_key="alice-key", allowed_ips=["10.0.0.2/32"]),
+            WireGuardPeer(identifier="bob", name="bob", public_key="bob-key", allowed_ips=["10.0.0.10/32", "10.0.0.3/32"]),
+        ]
+        patcher = mock.patch("wgadmin.views._wg_service")
+        self.service = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.service.list_peers.return_value = self.peers
+
+    def test_renders_peers_with_active_links(self):
+        token = ConfigDownloadToken.create_token(client_identifier="alice")
+        ConfigDownloadToken.create_token(client_identifier="bob", ttl_minutes=-1)
+        response = self.client.get(reverse("clients"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.context["token_map"]), {"alice"})
+        self.assertContains(response, reverse("public-config", kwargs={"token": token.token}))
+        self.assertEqual(sorted(response.context["used_names"]), ["alice", "bob"])
+        self.assertEqual(sorted(response.context["used_ips"]), ["10.0.0.10/32", "10.0.0.2/32", "10.0.0.3/32"])
+        self.assertEqual(response.context["create_form"].initial["allowed_ips"], "10.0.0.4/32")
+
+    def test_token_cleanup_is_throttled(self):
+        cache.clear()
+        with mock.patch("wgadmin.views._cleanup_tokens") as cleanup:
+            self.client.get(reverse("clients"))
+            self.client.get(reverse("clients"))
+        cleanup.assert_called_once()
+
+    def test_disable_records_audit_entry(self):
+        response = self.client.post(reverse("client-disable", kwargs={"identifier": "alice"}))
+        self.assertRedirects(response, reverse("clients"), fetch_redirect_response=False)
+        self.service.set_peer_enabled.assert_called_once_with("alice", False)
+        entry = AuditLog.objects.get()
+        self.assertEqual((entry.action, entry.client_identifier, entry.performed_by), ("disable", "alice", self.user))
+
+    def test_rejects_overlong_identifier(self):
+        response = self.client.post(reverse("client-disable", kwargs={"identifier": "a" * 256}))
+        self.assertRedirects(response, reverse("clients"), fetch_redirect_response=False)
+        self.service.set_peer_enabled.assert_not_called()
@@ -1,10 +1,18 @@
+import tempfile
 from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
+from wgadmin import views
 from wgadmin.models import ConfigDownloadToken
+from wgadmin.services.wireguard import WireGuardPeer
 
 
 class ConfigDownloadTokenTest(TestCase):
@@ -15,6 +23,23 @@ class ConfigDownloadTokenTest(TestCase):
         self.assertTrue(token.is_expired)
 
 
+class CleanupTokensCommandTest(TestCase):
+    def test_deactivates_expired_tokens_in_batches(self):
+        expired = [ConfigDownloadToken.create_token(client_identifier=f"c{i}", ttl_minutes=-1) for i in range(3)]
+        active = ConfigDownloadToken.create_token(client_identifier="live")
+        out = StringIO()
+        call_command("cleanup_tokens", batch_size=2, stdout=out)
+        self.assertIn("Deactivated 3 expired token(s).", out.getvalue())
+        self.assertFalse(ConfigDownloadToken.objects.filter(pk__in=[t.pk for t in expired], is_active=True).exists())
+        active.refresh_from_db()
+        self.assertTrue(active.is_active)
+
+    def test_rejects_non_positive_batch_size(self):
+        for value in ("0", "-5"):
+            with self.assertRaises(CommandError):
+                call_command("cleanup_tokens", "--batch-size", value)
+
+
 class PublicConfigViewTest(TestCase):
     def test_invalid_token(self):
         response = self.client.get(reverse("public-config", kwargs={"token": "missing"}))
@@ -26,3 +51,56 @@ class PublicConfigViewTest(TestCase):
         self.assertEqual(response.status_code, 404)
         token.refresh_from_db()
         self.assertFalse(token.is_active)
+
+    def test_qr_is_rendered_once_per_token(self):
+        cache.clear()
+        token = ConfigDownloadToken.create_token(client_identifier="alice")
+        peer = WireGuardPeer(identifier="alice", name="alice", public_key="alice-key", allowed_ips=["10.0.0.2/32"])
+        with mock.patch("wgadmin.views._wg_service") as get_service:
+            service = get_service.return_value
+            service.get_peer.return_value = peer
+            service.read_config_for_peer.return_value = "[Interface]\nPrivateKey = secret\n"
+            url = reverse("public-config-qr", kwargs={"token": token.token})
+            first = self.client.get(url)
+            second = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["Content-Type"], "image/png")
+        self.assertTrue(first.content.startswith(b"\x89PNG"))
+        self.assertEqual(first.content, second.content)
+        service.read_config_for_peer.assert_called_once_with(peer)
+
+    def _real_service_settings(self, root: Path, **overrides):
+        """Settings for an unmocked service whose peer alice has a private and a public config copy."""
+        peer_block = "# alice\n[Peer]\nPublicKey = alice-key\nAllowedIPs = 10.0.0.2/32\n"
+        (root / "wg0.conf").write_text(peer_block, encoding="utf-8")
+        for name in ("client", "public"):
+            (root / name).mkdir()
+            (root / name / "alice.conf").write_text(f"[Interface]\n# {name} copy\n", encoding="utf-8")
+        # The shared service copies WG_* settings when built; rebuild it for these settings and after.
+        views._service = None
+        self.addCleanup(setattr, views, "_service", None)
+        return override_settings(
+            WG_CONFIG_PATH=root / "wg0.conf",
+            WG_CLIENT_CONFIG_DIR=root / "client",
+            WG_PUBLIC_CONF_DIR=root / "public",
+            WG_USE_SUDO=False,
+            **overrides,
+        )
+
+    def test_download_hands_off_public_copy_to_nginx(self):
+        token = ConfigDownloadToken.create_token(client_identifier="alice")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self._real_service_settings(Path(tmp_dir), WG_ACCEL_REDIRECT_LOCATION="/protected-configs/"):
+                response = self.client.get(reverse("public-config-download", kwargs={"token": token.token}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-configs/alice.conf")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="alice.conf"')
+
+    def test_download_streams_client_copy_without_accel(self):
+        token = ConfigDownloadToken.create_token(client_identifier="alice")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self._real_service_settings(Path(tmp_dir)):
+                response = self.client.get(reverse("public-config-download", kwargs={"token": token.token}))
+                body = b"".join(response.streaming_content)
+        self.assertNotIn("X-Accel-Redirect", response)
+        self.assertEqual(body, b"[Interface]\n# client copy\n")
@@ -0,0 +1,98 @@
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from wgadmin import views
+from wgadmin.services.wireguard import WireGuardService
+
+WG_DUMP = (
+    "server-private-key\tserver-public-key\t51820\toff\n"
+    "(none)\talice-public-key\t(none)\t203.0.113.7:51820\t10.0.0.2/32\t1700000000\t1024\t2048\toff\n"
+    "(none)\tanonymous-public-key\t(none)\t(none)\t10.0.0.5/32\t0\t0\t0\t25\n"
+    "truncated\tline\n"
+)
+
+SAMPLE_CONFIG = """[Interface]
+# server
+Address = 10.0.0.1/24
+PrivateKey = server-private-key
+
+# alice
+[Peer]
+PublicKey = alice-public-key
+AllowedIPs = 10.0.0.2/32
+
+# Name: bob
+#[Peer]
+#PublicKey = bob-public-key
+#AllowedIPs = 10.0.0.3/32, 10.0.0.4/32
+
+[Peer]
+PublicKey = anonymous-public-key
+AllowedIPs = 10.0.0.5/32
+PersistentKeepalive = 25
+"""
+
+
+@override_settings(WG_USE_SUDO=False)
+class ParseConfigTest(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.config_path = Path(tmp_dir.name) / "wg0.conf"
+        self.config_path.write_text(SAMPLE_CONFIG, encoding="utf-8")
+        self.service = WireGuardService(config_path=self.config_path)
+
+    def test_parses_enabled_disabled_and_unnamed_peers(self):
+        peers = self.service.list_peers(include_runtime=False)
+        self.assertEqual([peer.identifier for peer in peers], ["alice", "bob", "anonymous-public-key"])
+        self.assertEqual([peer.is_enabled for peer in peers], [True, False, True])
+        self.assertEqual(peers[1].allowed_ips, ["10.0.0.3/32", "10.0.0.4/32"])
+        self.assertEqual(peers[2].name, "anonymous-pu")
+        self.assertEqual(peers[2].persistent_keepalive, 25)
+
+    def test_reparses_when_config_changes(self):
+        self.assertEqual(len(self.service.list_peers(include_runtime=False)), 3)
+        stat = self.config_path.stat()
+        self.config_path.write_text(SAMPLE_CONFIG.split("# Name: bob")[0], encoding="utf-8")
+        os.utime(self.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertEqual([peer.identifier for peer in self.service.list_peers(include_runtime=False)], ["alice"])
+
+    def test_reparses_when_size_changes_within_same_mtime(self):
+        self.assertEqual(len(self.service.list_peers(include_runtime=False)), 3)
+        stat = self.config_path.stat()
+        self.config_path.write_text(SAMPLE_CONFIG.split("# Name: bob")[0], encoding="utf-8")
+        os.utime(self.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual([peer.identifier for peer in self.service.list_peers(include_runtime=False)], ["alice"])
+
+    def test_merges_runtime_dump(self):
+        completed = subprocess.CompletedProcess(args=[], returncode=0, stdout=WG_DUMP, stderr="")
+        with mock.patch("wgadmin.services.wireguard.subprocess.run", return_value=completed):
+            peers = self.service.list_peers(include_runtime=True)
+        alice, bob, anonymous = peers
+        self.assertEqual(alice.endpoint, "203.0.113.7:51820")
+        self.assertEqual(alice.latest_handshake.timestamp(), 1700000000)
+        self.assertEqual((alice.transfer_rx, alice.transfer_tx), (1024, 2048))
+        self.assertIsNone(bob.transfer_rx)
+        self.assertIsNone(anonymous.endpoint)
+        self.assertIsNone(anonymous.latest_handshake)
+        self.assertEqual(anonymous.persistent_keepalive, 25)
+
+
+class SharedServiceTest(SimpleTestCase):
+    def setUp(self):
+        # The service copies WG_* settings when built, so start from (and leave) a fresh instance.
+        views._service = None
+        self.addCleanup(setattr, views, "_service", None)
+
+    def test_reused_across_calls(self):
+        service = views._wg_service()
+        self.assertIs(views._wg_service(), service)
+
+    @override_settings(WG_INTERFACE="wg-test")
+    def test_built_from_current_settings(self):
+        self.assertEqual(views._wg_service().interface, "wg-test")
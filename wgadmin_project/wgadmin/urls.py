@@ -30,5 +30,6 @@ urlpatterns = [
         name="client-activate",
     ),
     path("config/<str:token>/", views.public_config, name="public-config"),
+    path("config/<str:token>/qr.png", views.public_config_qr, name="public-config-qr"),
     path("config/<str:token>/download/", views.public_config_download, name="public-config-download"),
 ]
@@ -1,34 +1,53 @@
-import base64
 import logging
 import os
-import re
-from datetime import timedelta
+import string
+from datetime import datetime, timedelta
+from functools import lru_cache
 from io import BytesIO
-from ipaddress import IPv4Network, ip_network
+from ipaddress import IPv4Network, IPv6Network, ip_network
 from typing import Any, Dict
 
 import qrcode
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.cache import cache
+from django.db import transaction
 from django.http import FileResponse, Http404, HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.http import content_disposition_header
 
-from .forms import ActivateClientForm, ClientCreateForm, DeleteClientForm, ToggleClientForm
+from .forms import ClientCreateForm
 from .models import AuditLog, ConfigDownloadToken
 from .services.wireguard import WireGuardError, WireGuardService
 
 logger = logging.getLogger(__name__)
 
-# Security: Pattern for valid identifiers (alphanumeric, dot, dash, underscore, plus, equals)
-IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z0-9._+=-]+$")
+# Client list renders purge expired/old download tokens at most once per interval (seconds) per cache slot.
+TOKEN_CLEANUP_INTERVAL = 300
+TOKEN_CLEANUP_KEY = "wgadmin:token-cleanup"
+
+# Security: Characters allowed in identifiers (alphanumeric, dot, dash, underscore, plus, equals)
+IDENTIFIER_CHARS = frozenset(string.ascii_letters + string.digits + "._+=-")
+# Matches the client_identifier columns; anything longer is rejected before the character scan.
+MAX_IDENTIFIER_LENGTH = 255
 
 
 def _validate_identifier(identifier: str) -> bool:
     """Validate that identifier contains only safe characters."""
-    return bool(IDENTIFIER_PATTERN.match(identifier))
+    return 0 < len(identifier) <= MAX_IDENTIFIER_LENGTH and IDENTIFIER_CHARS.issuperset(identifier)
+
+
+def _audit(request: HttpRequest, **entry: Any) -> None:
+    """Record an action by the current user; AuditLogMiddleware flushes the request's entries in bulk."""
+    entry["performed_by"] = request.user
+    buffer = getattr(request, "_audit_log_buffer", None)
+    if buffer is None:
+        AuditLog.objects.create(**entry)
+    else:
+        buffer.append(entry)
 
 
 def staff_required(view_func):
@@ -36,6 +55,17 @@ def staff_required(view_func):
     return decorated
 
 
+_service: WireGuardService | None = None
+
+
+def _wg_service() -> WireGuardService:
+    """Process-wide service, so the parsed config and `wg show dump` caches carry across requests."""
+    global _service
+    if _service is None:
+        _service = WireGuardService()
+    return _service
+
+
 def _safe_list_peers(request: HttpRequest, service: WireGuardService, include_runtime: bool = True):
     try:
         return service.list_peers(include_runtime=include_runtime)
@@ -45,29 +75,42 @@ def _safe_list_peers(request: HttpRequest, service: WireGuardService, include_ru
         return []
 
 
-def get_suggested_allowed_ips(existing_ips: set[str]) -> str:
-    """Return the next available /32 address based on config data or env prefix."""
-    def _normalize_prefix(raw_prefix: str) -> str:
-        raw_prefix = (raw_prefix or "").strip()
-        if not raw_prefix:
-            return ""
-        try:
-            network = ip_network(raw_prefix if "/" in raw_prefix else f"{raw_prefix}/24", strict=False)
-            if isinstance(network, IPv4Network):
-                parts = str(network.network_address).split(".")
-                return ".".join(parts[:3]) + "."
-        except ValueError:
-            pass
-        parts = raw_prefix.split(".")
-        if len(parts) >= 3:
-            return ".".join(parts[:3]) + "."
+@lru_cache(maxsize=4096)
+def _parse_network(value: str) -> IPv4Network | IPv6Network:
+    """ip_network(value, strict=False), memoized: the same peer IPs are parsed on every render."""
+    return ip_network(value, strict=False)
+
+
+# Host octets handed out to clients (.1 is the server, .255 broadcast).
+_CLIENT_HOSTS = frozenset(range(2, 255))
+
+
+@lru_cache(maxsize=64)
+def _normalize_prefix(raw_prefix: str) -> str:
+    """Reduce an address or network to its first three IPv4 octets, e.g. "10.0.0."."""
+    raw_prefix = (raw_prefix or "").strip()
+    if not raw_prefix:
         return ""
+    try:
+        network = _parse_network(raw_prefix if "/" in raw_prefix else f"{raw_prefix}/24")
+        if isinstance(network, IPv4Network):
+            parts = str(network.network_address).split(".")
+            return ".".join(parts[:3]) + "."
+    except ValueError:
+        pass
+    parts = raw_prefix.split(".")
+    if len(parts) >= 3:
+        return ".".join(parts[:3]) + "."
+    return ""
 
+
+def get_suggested_allowed_ips(existing_ips: set[str]) -> str:
+    """Return the next available /32 address based on config data or env prefix."""
     prefix = _normalize_prefix(os.environ.get("SERVER_WG_IPV4_PREFIX", ""))
     ipv4_networks: list[IPv4Network] = []
     for raw_ip in existing_ips:
         try:
-            network = ip_network(raw_ip, strict=False)
+            network = _parse_network(raw_ip)
         except ValueError:
             continue
         if isinstance(network, IPv4Network):
@@ -77,12 +120,30 @@ def get_suggested_allowed_ips(existing_ips: set[str]) -> str:
     if not prefix:
         prefix = _normalize_prefix("10.0.0.")
 
-    used_values = {f"{net.network_address}/{net.prefixlen}" for net in ipv4_networks}
-    for host in range(2, 255):
-        candidate = f"{prefix}{host}/32"
-        if candidate not in used_values:
-            return candidate
-    return f"{prefix}2/32"
+    # Last octets of /32 peers inside the prefix.
+    used_hosts = {
+        int(net.network_address) & 0xFF
+        for net in ipv4_networks
+        if net.prefixlen == 32 and str(net.network_address).startswith(prefix)
+    }
+    host = min(_CLIENT_HOSTS.difference(used_hosts), default=2)
+    return f"{prefix}{host}/32"
+
+
+@lru_cache(maxsize=32)
+def _base_url(scheme: str, host: str) -> str:
+    """Absolute site root without trailing slash, e.g. "https://vpn.example.com"."""
+    return f"{scheme}://{host}"
+
+
+def _collect_used(peers) -> tuple[set[str], set[str]]:
+    """Return (identifiers, allowed IPs) already taken by peers, in a single pass."""
+    names: set[str] = set()
+    ips: set[str] = set()
+    for peer in peers:
+        names.add(peer.identifier)
+        ips.update(peer.allowed_ips)
+    return names, ips
 
 
 def _build_client_context(
@@ -91,36 +152,38 @@ def _build_client_context(
     peers,
     create_form: ClientCreateForm | None = None,
 ) -> Dict[str, Any]:
-    used_ips = sorted({ip for peer in peers for ip in peer.allowed_ips})
-    used_names = sorted({peer.identifier for peer in peers})
-    suggested_allowed_ips = get_suggested_allowed_ips(set(used_ips))
+    used_names, used_ips = _collect_used(peers)
+    suggested_allowed_ips = get_suggested_allowed_ips(used_ips)
     if create_form is None:
         create_form = ClientCreateForm(
             initial={"allowed_ips": suggested_allowed_ips},
             used_ips=used_ips,
             used_names=used_names,
         )
-    _cleanup_tokens()
-    active_tokens = ConfigDownloadToken.objects.filter(is_active=True, expires_at__gt=timezone.now())
-    token_map = {token.client_identifier: token for token in active_tokens}
-    base_url = request.build_absolute_uri("/")[:-1]  # remove trailing slash
+    now = timezone.now()
+    _maybe_cleanup_tokens(now)
+    # Expired rows are filtered out here, so cleanup is housekeeping rather than a prerequisite.
+    # Named rows expose .token/.expires_at to the template without building model instances.
+    active_tokens = ConfigDownloadToken.objects.filter(is_active=True, expires_at__gt=now).values_list(
+        "client_identifier", "token", "expires_at", named=True
+    )
+    token_map = {row.client_identifier: row for row in active_tokens.iterator(chunk_size=200)}
+    base_url = _base_url(request.scheme, request.get_host())
     return {
         "peers": peers,
         "create_form": create_form,
-        "activate_form": ActivateClientForm(),
-        "toggle_form": ToggleClientForm(),
-        "delete_form": DeleteClientForm(),
         "token_map": token_map,
         "wg_config_path": settings.WG_CONFIG_PATH,
-        "used_ips": used_ips,
-        "used_names": used_names,
+        # Only fed to the client-side includes() checks, so order does not matter.
+        "used_ips": list(used_ips),
+        "used_names": list(used_names),
         "base_url": base_url,
     }
 
 
 @staff_required
 def client_list(request: HttpRequest) -> HttpResponse:
-    service = WireGuardService()
+    service = _wg_service()
     peers = _safe_list_peers(request, service, include_runtime=True)
     context = _build_client_context(request, service, peers)
     return render(request, "wgadmin/client_list.html", context)
@@ -130,10 +193,9 @@ def client_list(request: HttpRequest) -> HttpResponse:
 def create_client(request: HttpRequest) -> HttpResponse:
     if request.method != "POST":
         raise Http404()
-    service = WireGuardService()
+    service = _wg_service()
     peers = _safe_list_peers(request, service, include_runtime=False)
-    used_ips = {ip for peer in peers for ip in peer.allowed_ips}
-    used_names = {peer.identifier for peer in peers}
+    used_names, used_ips = _collect_used(peers)
 
     form = ClientCreateForm(request.POST, used_ips=used_ips, used_names=used_names)
     if form.is_valid():
@@ -150,10 +212,10 @@ def create_client(request: HttpRequest) -> HttpResponse:
             else:
                 messages.error(request, "Could not create client. Please check server logs.")
         else:
-            AuditLog.objects.create(
+            _audit(
+                request,
                 action="create",
                 client_identifier=form.cleaned_data["name"],
-                performed_by=request.user,
                 details={"allowed_ips": form.cleaned_data["allowed_ips"]},
             )
             messages.success(request, f"Client {form.cleaned_data['name']} created.")
@@ -172,17 +234,17 @@ def toggle_client(request: HttpRequest, identifier: str, enable: bool) -> HttpRe
         logger.warning("Invalid identifier attempted: %s", identifier[:50])
         messages.error(request, "Invalid client identifier.")
         return redirect("clients")
-    service = WireGuardService()
+    service = _wg_service()
     try:
         service.set_peer_enabled(identifier, enable)
     except WireGuardError as exc:
         logger.error("Failed to toggle client %s: %s", identifier, exc)
         messages.error(request, "Unable to update client. Please check server logs.")
     else:
-        AuditLog.objects.create(
+        _audit(
+            request,
             action="enable" if enable else "disable",
             client_identifier=identifier,
-            performed_by=request.user,
         )
         messages.success(request, f"{identifier} {'enabled' if enable else 'disabled'}.")
     return redirect("clients")
@@ -207,14 +269,14 @@ def delete_client(request: HttpRequest, identifier: str) -> HttpResponse:
         logger.warning("Invalid identifier attempted for deletion: %s", identifier[:50])
         messages.error(request, "Invalid client identifier.")
         return redirect("clients")
-    service = WireGuardService()
+    service = _wg_service()
     try:
         service.delete_peer(identifier)
     except WireGuardError as exc:
         logger.error("Failed to delete client %s: %s", identifier, exc)
         messages.error(request, "Unable to delete client. Please check server logs.")
     else:
-        AuditLog.objects.create(action="delete", client_identifier=identifier, performed_by=request.user)
+        _audit(request, action="delete", client_identifier=identifier)
         messages.success(request, f"{identifier} deleted.")
     return redirect("clients")
 
@@ -228,82 +290,133 @@ def activate_client(request: HttpRequest, identifier: str) -> HttpResponse:
         logger.warning("Invalid identifier attempted for activation: %s", identifier[:50])
         messages.error(request, "Invalid client identifier.")
         return redirect("clients")
-    service = WireGuardService()
+    service = _wg_service()
     peer = service.get_peer(identifier)
     if not peer:
         messages.error(request, "Client not found.")
         return redirect("clients")
 
     token = ConfigDownloadToken.create_token(client_identifier=peer.identifier, client_name=peer.name)
-    AuditLog.objects.create(action="activate", client_identifier=peer.identifier, performed_by=request.user)
+    _audit(request, action="activate", client_identifier=peer.identifier)
     activation_url = request.build_absolute_uri(reverse("public-config", kwargs={"token": token.token}))
     messages.success(request, f"Activated link for {peer.name}: {activation_url}")
     return redirect("clients")
 
 
+def _public_tokens():
+    # Public views only need expiry state and the peer to serve; skip the other columns.
+    return ConfigDownloadToken.objects.only("client_identifier", "is_active", "expires_at")
+
+
+def _active_public_token(token: str, now: datetime) -> ConfigDownloadToken | None:
+    """Return the token, or None (after deactivating it) if it has expired by `now`."""
+    download_token = get_object_or_404(_public_tokens(), token=token, is_active=True)
+    if download_token.expires_at <= now:
+        # A conditional UPDATE rather than save(): concurrent hits on an expiring token deactivate it once.
+        ConfigDownloadToken.objects.filter(pk=download_token.pk, is_active=True).update(is_active=False)
+        return None
+    return download_token
+
+
 def public_config(request: HttpRequest, token: str) -> HttpResponse:
-    download_token = get_object_or_404(ConfigDownloadToken, token=token, is_active=True)
-    if download_token.is_expired:
-        download_token.is_active = False
-        download_token.save(update_fields=["is_active"])
+    download_token = _active_public_token(token, timezone.now())
+    if download_token is None:
         return render(request, "wgadmin/link_expired.html", status=404)
 
-    service = WireGuardService()
-    peer = service.get_peer(download_token.client_identifier)
+    peer = _wg_service().get_peer(download_token.client_identifier)
     if not peer:
         raise Http404("Client not found")
-
-    try:
-        config_text = service.read_config_for_peer(peer)
-    except WireGuardError:
-        raise Http404("Config not found")
-    qr_data_url = _qr_data_url(config_text)
+    # The QR image is fetched separately so the page itself is not held up by rendering it.
     context = {
         "peer": peer,
         "token": download_token,
-        "qr_data_url": qr_data_url,
+        "qr_url": reverse("public-config-qr", kwargs={"token": token}),
         "download_url": reverse("public-config-download", kwargs={"token": token}),
     }
     return render(request, "wgadmin/public_config.html", context)
 
 
-def public_config_download(request: HttpRequest, token: str) -> FileResponse:
-    download_token = get_object_or_404(ConfigDownloadToken, token=token, is_active=True)
-    if download_token.is_expired:
-        download_token.is_active = False
-        download_token.save(update_fields=["is_active"])
+def public_config_qr(request: HttpRequest, token: str) -> HttpResponse:
+    now = timezone.now()
+    download_token = _active_public_token(token, now)
+    if download_token is None:
         raise Http404()
 
-    service = WireGuardService()
+    # The config behind a token does not change during its lifetime, so render the QR once per token.
+    cache_key = f"wgadmin:qr:{token}"
+    png = cache.get(cache_key)
+    if png is None:
+        service = _wg_service()
+        peer = service.get_peer(download_token.client_identifier)
+        if not peer:
+            raise Http404()
+        try:
+            config_text = service.read_config_for_peer(peer)
+        except WireGuardError:
+            raise Http404()
+        png = _qr_png(config_text)
+        ttl = int((download_token.expires_at - now).total_seconds())
+        cache.set(cache_key, png, timeout=max(ttl, 1))
+    response = HttpResponse(png, content_type="image/png")
+    # The image embeds the client's private key.
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+def public_config_download(request: HttpRequest, token: str) -> HttpResponse | FileResponse:
+    download_token = _active_public_token(token, timezone.now())
+    if download_token is None:
+        raise Http404()
+
+    service = _wg_service()
     peer = service.get_peer(download_token.client_identifier)
     if not peer:
         raise Http404()
+    filename = f"{peer.identifier}.conf"
+    accel_location = settings.WG_ACCEL_REDIRECT_LOCATION
+    # nginx can only read the public copy, so hand off that one rather than whatever get_config_path() prefers.
+    public_path = service.get_public_config_path(peer) if accel_location else None
+    if public_path is not None:
+        # Let nginx send the file from its internal location; no file I/O in the worker.
+        response = HttpResponse(content_type="application/octet-stream")
+        response["X-Accel-Redirect"] = f"{accel_location.rstrip('/')}/{public_path.name}"
+        response["Content-Disposition"] = content_disposition_header(as_attachment=True, filename=filename)
+        return response
     config_path = service.get_config_path(peer)
     if not config_path.exists():
         raise Http404()
-    return FileResponse(config_path.open("rb"), as_attachment=True, filename=f"{peer.identifier}.conf")
+    return FileResponse(config_path.open("rb"), as_attachment=True, filename=filename)
 
 
-def _qr_data_url(text: str) -> str:
+def _qr_png(text: str) -> bytes:
     qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M)
     qr.add_data(text)
     qr.make(fit=True)
     img = qr.make_image(fill_color="black", back_color="white")
     buf = BytesIO()
     img.save(buf, format="PNG")
-    encoded = base64.b64encode(buf.getvalue()).decode("ascii")
-    return f"data:image/png;base64,{encoded}"
+    return buf.getvalue()
+
+
+def _maybe_cleanup_tokens(now: datetime) -> None:
+    """Run token cleanup at most once per TOKEN_CLEANUP_INTERVAL per process."""
+    # cache.add() claims the slot atomically within the cache backend. With the default LocMemCache each
+    # worker has its own slot; configure a shared cache (Redis, Memcached, DB) to clean once across workers.
+    if cache.add(TOKEN_CLEANUP_KEY, True, timeout=TOKEN_CLEANUP_INTERVAL):
+        _cleanup_tokens(now)
 
 
-def _cleanup_tokens() -> None:
+def _cleanup_tokens(now: datetime) -> None:
     """Deactivate expired tokens and delete old ones."""
-    now = timezone.now()
-    # Deactivate expired tokens
-    expired_count = ConfigDownloadToken.objects.filter(is_active=True, expires_at__lte=now).update(is_active=False)
+    with transaction.atomic():
+        # Deactivate expired tokens
+        expired_count = ConfigDownloadToken.objects.filter(is_active=True, expires_at__lte=now).update(
+            is_active=False
+        )
+        # Delete tokens older than 30 days to prevent database bloat
+        cutoff = now - timedelta(days=30)
+        deleted_count, _ = ConfigDownloadToken.objects.filter(created_at__lt=cutoff).delete()
     if expired_count:
         logger.info("Deactivated %d expired tokens", expired_count)
-    # Delete tokens older than 30 days to prevent database bloat
-    cutoff = now - timedelta(days=30)
-    deleted_count, _ = ConfigDownloadToken.objects.filter(created_at__lt=cutoff).delete()
     if deleted_count:
         logger.info("Deleted %d old tokens", deleted_count)
@@ -38,6 +38,8 @@ env = environ.Env(
     WG_USE_SUDO=(bool, True),
     WG_SUDO_BIN=(str, "sudo"),
     WG_SCRIPT_TIMEOUT=(int, 15),
+    WG_RUNTIME_CACHE_TTL=(float, 1.0),
+    WG_ACCEL_REDIRECT_LOCATION=(str, ""),
 )
 
 # Read .env file from project root (parent of wgadmin_project)
@@ -80,6 +82,7 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "wgadmin.middleware.AuditLogMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -161,10 +164,10 @@ _HTTPS_ENABLED = env("SECURE_SSL_REDIRECT")
 
 # if _HTTPS_ENABLED or not DEBUG:
 if False:
-    SECURE_SSL_REDIRECT = env("SECURE_SSL_REDIRECT") if _HTTPS_ENABLED else True
+    SECURE_SSL_REDIRECT = True
     SESSION_COOKIE_SECURE = env("SESSION_COOKIE_SECURE") if _HTTPS_ENABLED else True
     CSRF_COOKIE_SECURE = env("CSRF_COOKIE_SECURE") if _HTTPS_ENABLED else True
-    SECURE_HSTS_SECONDS = env("SECURE_HSTS_SECONDS") if env("SECURE_HSTS_SECONDS") else 31536000
+    SECURE_HSTS_SECONDS = env("SECURE_HSTS_SECONDS") or 31536000
     SECURE_HSTS_INCLUDE_SUBDOMAINS = env("SECURE_HSTS_INCLUDE_SUBDOMAINS") if _HTTPS_ENABLED else True
     SECURE_HSTS_PRELOAD = env("SECURE_HSTS_PRELOAD")
 else:
@@ -258,6 +261,9 @@ WG_QR_DIR = Path(env("WG_QR_DIR"))
 WG_USE_SUDO = env("WG_USE_SUDO")
 WG_SUDO_BIN = env("WG_SUDO_BIN")
 WG_SCRIPT_TIMEOUT = env("WG_SCRIPT_TIMEOUT")
+WG_RUNTIME_CACHE_TTL = env("WG_RUNTIME_CACHE_TTL")
+# nginx `internal` location aliasing WG_PUBLIC_CONF_DIR (e.g. "/protected-configs/"); empty serves files from Django
+WG_ACCEL_REDIRECT_LOCATION = env("WG_ACCEL_REDIRECT_LOCATION")
 
 # =============================================================================
 # TAILWIND CSS (convenience settings - not used in CDN mode)